@@ -54,7 +54,8 @@ merger = Merger(
 )
 merge_image = merger.merge_action(action)
 
-cv2.imshow("Matches without DNN-RANSAC", merge_image)
+if merge_image is not None:
+	cv2.imshow("Matches without DNN-RANSAC", merge_image)
 
 features_1, features_2 = get_features_from_merged(action)
 first_key_points, second_key_points = get_key_points_from_features(features_1, features_2)
@@ -123,7 +124,8 @@ dnn_inliers_image = merger.merge_inliers(action)
 #visualizer = Visualizer(action=action)
 #visualizer.plot_action_point_cloud(registration_method="standard")
 
-cv2.imshow("DNN-RANSAC Inliers", dnn_inliers_image)
+if dnn_inliers_image is not None:
+	cv2.imshow("DNN-RANSAC Inliers", dnn_inliers_image)
 
 action.set_fundamental_matrix(cv_best_f, cv_best_mask)
 action.compute_essential_matrix()
@@ -140,5 +142,6 @@ cv_inliers_image = merger.merge_inliers(action)
 #visualizer = Visualizer(action=action)
 #visualizer.plot_action_point_cloud(registration_method="standard")
 
-cv2.imshow("RANSAC Inliers", cv_inliers_image)
+if cv_inliers_image is not None:
+	cv2.imshow("RANSAC Inliers", cv_inliers_image)
 cv2.waitKey(0)
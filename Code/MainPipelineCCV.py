@@ -73,5 +73,6 @@ inliers_image = merger.merge_inliers(action)
 # visualizer = Visualizer(action=action)
 # visualizer.plot_action_point_cloud(registration_method="standard")
 
-cv2.imshow("Inliers", inliers_image)
+if inliers_image is not None:
+	cv2.imshow("Inliers", inliers_image)
 cv2.waitKey(0)
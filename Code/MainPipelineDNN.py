@@ -52,7 +52,8 @@ merger = Merger(
 	matcher_method="FLANN"
 )
 merge_image = merger.merge_action(action)
-cv2.imshow("Matches without DNN-RANSAC", merge_image)
+if merge_image is not None:
+	cv2.imshow("Matches without DNN-RANSAC", merge_image)
 
 features_1, features_2 = get_features_from_merged(action)
 first_key_points, second_key_points = get_key_points_from_features(features_1, features_2)
@@ -117,5 +118,6 @@ inliers_image = merger.merge_inliers(action)
 #visualizer = Visualizer(action=action)
 #visualizer.plot_action_point_cloud(registration_method="standard")
 
-cv2.imshow("Inliers", inliers_image)
+if inliers_image is not None:
+	cv2.imshow("Inliers", inliers_image)
 cv2.waitKey(0)
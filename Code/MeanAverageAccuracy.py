@@ -106,7 +106,11 @@ class MeanAverageAccuracy(object):
 		
 		# I iterate over all the images of the test set to compute the
 		# rototranslation of the dnn ransac and classical ransac.
-		for i in range(self.last_image - self.frames_distance):
+		num_couples = self.last_image - self.frames_distance
+		next_frames = self._get_frames(0, self.frames_distance)
+		next_frames[0].prefetch()
+		next_frames[1].prefetch()
+		for i in range(num_couples):
 			img1 = i
 			img2 = i + self.frames_distance
 			
@@ -114,7 +118,14 @@ class MeanAverageAccuracy(object):
 				print("Analysing images %s and %s" % (img1, img2))
 			
 			total += 1
-			frame1, frame2 = self._get_frames(img1, img2)
+			frame1, frame2 = next_frames
+			
+			# decode the next couple while the current one is processed
+			if i + 1 < num_couples:
+				next_frames = self._get_frames(img1 + 1, img2 + 1)
+				next_frames[0].prefetch()
+				next_frames[1].prefetch()
+			
 			action = Action(frame1, frame2)
 			dnn_f, dnn_mask, cv_f, cv_mask = self.__get_dnn_cv_matrices(action)
 			
@@ -1,7 +1,10 @@
 # Python imports
+import hashlib
 import linecache
 import os
-from typing import Tuple, Union
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union
 
 # External imports
 import cv2
@@ -16,9 +19,17 @@ from open3d.cpu.pybind.geometry import PointCloud
 
 from ProjectObject import ProjectObject
 
+# Pool shared by all frames to decode images ahead of their use
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
 
 class Frame(ProjectObject):
 	ERROR_KEY = ProjectObject.ERROR_KEY + ["frame"]
+	# Decoding flags, depth is 16-bit and must not be downcast
+	RGB_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+	DEPTH_FLAGS = cv2.IMREAD_UNCHANGED
+	# Directory where the key points and descriptors are cached
+	CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
 
 	def __init__(
 		self,
@@ -47,12 +58,56 @@ class Frame(ProjectObject):
 		self.f_matrix = None
 		self.R, self.t = None, None
 
+		# Decoded images are cached to avoid reading the files more than once
+		self._cv2_rgb = None
+		self._cv2_depth = None
+		self._cv2_gray = None
+		self._size = None
+		self._cv2_rgb_future = None
+		self._cv2_depth_future = None
+
 		# Kinect v1 intrinsic parameters are the default of the method
 		self.fx = fx  # 514.120
 		self.fy = fy  # 513.841
 		self.Cx = Cx  # 310.744
 		self.Cy = Cy  # 262.611
 
+	@property
+	def descriptors(self) -> np.ndarray:
+		"""The descriptors of the key points as a C-contiguous matrix."""
+		return self._descriptors
+
+	@descriptors.setter
+	def descriptors(self, descriptors) -> None:
+		if descriptors is not None:
+			descriptors = np.asarray(descriptors)
+			dtype = np.uint8 if descriptors.dtype == np.uint8 else np.float32
+			descriptors = np.ascontiguousarray(descriptors, dtype=dtype)
+			assert descriptors.flags["C_CONTIGUOUS"]
+		self._descriptors = descriptors
+
+	@property
+	def rgb(self) -> np.ndarray:
+		"""The cached cv2 color image, it is shared and must not be modified."""
+		if self._cv2_rgb is None:
+			if self._cv2_rgb_future is not None:
+				self._cv2_rgb = self._cv2_rgb_future.result()
+				self._cv2_rgb_future = None
+			else:
+				self._cv2_rgb = cv2.imread(self.color_path, self.RGB_FLAGS)
+		return self._cv2_rgb
+
+	@property
+	def depth(self) -> np.ndarray:
+		"""The cached cv2 depth image, it is shared and must not be modified."""
+		if self._cv2_depth is None:
+			if self._cv2_depth_future is not None:
+				self._cv2_depth = self._cv2_depth_future.result()
+				self._cv2_depth_future = None
+			else:
+				self._cv2_depth = cv2.imread(self.depth_path, self.DEPTH_FLAGS)
+		return self._cv2_depth
+
 	def extract_pose(self) -> np.ndarray:
 		"""Get the pose of the image from the paths.
 		
@@ -133,12 +188,14 @@ class Frame(ProjectObject):
 			The image with the depth information.
 		:rtype: PIL.image
 		"""
+		# the images are wrapped from the cv2 ones, decoded once
 		if ret is None:
-			return Image.open(self.color_path), Image.open(self.depth_path)
+			return (Image.fromarray(cv2.cvtColor(self.rgb, cv2.COLOR_BGR2RGB)),
+			        Image.fromarray(self.depth))
 		elif ret == "rgb":
-			return Image.open(self.color_path)
+			return Image.fromarray(cv2.cvtColor(self.rgb, cv2.COLOR_BGR2RGB))
 		elif ret == "depth":
-			return Image.open(self.depth_path)
+			return Image.fromarray(self.depth)
 
 	def get_o3d_images(self, ret: str = None) -> Union[o3d.geometry.Image,
 	                                                   Tuple[o3d.geometry.Image,
@@ -153,30 +210,216 @@ class Frame(ProjectObject):
 			The image with the depth information.
 		:rtype: open3d.image
 		"""
+		# the images are built from the cv2 ones, decoded once
 		if ret is None:
-			return o3d.io.read_image(self.color_path), o3d.io.read_image(self.depth_path)
+			return (o3d.geometry.Image(cv2.cvtColor(self.rgb, cv2.COLOR_BGR2RGB)),
+			        o3d.geometry.Image(self.depth))
 		elif ret == "rgb":
-			return o3d.io.read_image(self.color_path)
+			return o3d.geometry.Image(cv2.cvtColor(self.rgb, cv2.COLOR_BGR2RGB))
 		elif ret == "depth":
-			return o3d.io.read_image(self.depth_path)
+			return o3d.geometry.Image(self.depth)
 
-	def get_cv2_images(self, ret: str = None):
+	def get_cv2_images(self, ret: str = None, flags: int = None):
 		"""Return the cv2 images of color and depth.
 		:param ret:
 			Specified whether to return one or both the images.
 
+		:param flags:
+			The cv2 reading flags of the color image to use in place of the
+			default ones, the color image read with them is not cached. The
+			depth image is always read with the default flags to keep its
+			16-bit values.
+
 		:return:
 			The color image specified for this frame.
 		:rtype: cv2.image
 			The image with the depth information.
 		:rtype: cv2.image
 		"""
+		if flags is not None and ret != "depth":
+			if ret is None:
+				return cv2.imread(self.color_path, flags), self.depth.copy()
+			elif ret == "rgb":
+				return cv2.imread(self.color_path, flags)
+
 		if ret is None:
-			return cv2.imread(self.color_path), cv2.imread(self.depth_path)
+			return self.rgb.copy(), self.depth.copy()
 		elif ret == "rgb":
-			return cv2.imread(self.color_path)
+			return self.rgb.copy()
 		elif ret == "depth":
-			return cv2.imread(self.depth_path)
+			return self.depth.copy()
+
+	def get_gray(self, scale: float = 1.0) -> np.ndarray:
+		"""Return the grayscale cv2 image of the color image.
+
+		:param scale:
+			The factor by which the image is resized. Only the full size image
+			is cached.
+
+		:return:
+			The color image converted to grayscale.
+		:rtype: np.ndarray
+		"""
+		if scale != 1.0:
+			return self._get_scaled_gray(scale)
+
+		# always converted from the color image, so that the key points do not
+		# depend on whether it was already decoded
+		if self._cv2_gray is None:
+			self._cv2_gray = cv2.cvtColor(self.rgb, cv2.COLOR_BGR2GRAY)
+		return self._cv2_gray
+
+	def _get_scaled_gray(self, scale: float) -> np.ndarray:
+		"""Return the grayscale cv2 image of the color image resized.
+
+		The image is always resized before changing its color space, so that
+		the conversion works on the smallest buffer.
+
+		:param scale:
+			The factor by which the image is resized.
+
+		:return:
+			The resized grayscale image.
+		:rtype: np.ndarray
+		"""
+		width, height = self.get_size()
+		size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+		img = cv2.resize(self.rgb, size, interpolation=cv2.INTER_AREA)
+		return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+	def prefetch(self) -> None:
+		"""Start decoding the cv2 images of the frame in background.
+
+		The decoded images are collected by the first call needing them. The
+		depth image is skipped when the dataset has none.
+
+		:return:
+			None
+		"""
+		if self._cv2_rgb is None and self._cv2_rgb_future is None:
+			self._cv2_rgb_future = _PREFETCH_POOL.submit(cv2.imread,
+			                                             self.color_path,
+			                                             self.RGB_FLAGS)
+		if self._cv2_depth is None and self._cv2_depth_future is None and \
+				os.path.exists(self.depth_path):
+			self._cv2_depth_future = _PREFETCH_POOL.submit(cv2.imread,
+			                                               self.depth_path,
+			                                               self.DEPTH_FLAGS)
+
+	@classmethod
+	def preload_frames(cls, frames: List["Frame"]) -> None:
+		"""Decode the color images of many frames at once.
+
+		The JPEG color images are decoded in a single batch on the GPU when
+		torchvision and CUDA are available, all the other images are
+		prefetched on the CPU.
+
+		:param frames:
+			The frames whose images must be decoded.
+
+		:return:
+			None
+		"""
+		frames = [frame for frame in frames
+		          if frame._cv2_rgb is None and frame._cv2_rgb_future is None]
+		jpeg_frames = []
+		try:
+			import torch
+			from torchvision.io import ImageReadMode, decode_jpeg
+
+			if torch.cuda.is_available():
+				jpeg_frames = [frame for frame in frames
+				               if frame.color_path.lower().endswith((".jpg", ".jpeg"))]
+		except ImportError:
+			pass
+
+		if len(jpeg_frames) != 0:
+			data = []
+			for frame in jpeg_frames:
+				with open(frame.color_path, "rb") as file:
+					data.append(torch.frombuffer(bytearray(file.read()),
+					                             dtype=torch.uint8))
+			try:
+				images = decode_jpeg(data, mode=ImageReadMode.RGB, device="cuda")
+			except (TypeError, RuntimeError):
+				# old torchvision, corrupt JPEG or CUDA error, decode on the CPU
+				images = []
+
+			# from CHW RGB tensors to HWC BGR arrays as read by cv2
+			for frame, image in zip(jpeg_frames, images):
+				image = image.permute(1, 2, 0).cpu().numpy()
+				frame._cv2_rgb = np.ascontiguousarray(image[:, :, ::-1])
+
+		for frame in frames:
+			frame.prefetch()
+
+	def descriptors_cache_path(self, detector) -> str:
+		"""Get the path of the cache of key points and descriptors.
+
+		:param detector:
+			The detector computing the key points and the descriptors.
+
+		:return:
+			The path of the cache, it changes when the color image is modified.
+		:rtype: str
+		"""
+		key = "%s %s %s %s" % (os.path.abspath(self.color_path),
+		                       os.path.getmtime(self.color_path),
+		                       detector.method,
+		                       detector.num_features)
+		return os.path.join(self.CACHE_DIR,
+		                    hashlib.md5(key.encode()).hexdigest() + ".npz")
+
+	def load_or_compute_descriptors(self, detector) -> None:
+		"""Load key points and descriptors from the cache or compute them.
+
+		:param detector:
+			The detector computing the key points and the descriptors when they
+			are not cached.
+
+		:return:
+			None
+		"""
+		path = self.descriptors_cache_path(detector)
+		if os.path.exists(path):
+			with np.load(path) as cache:
+				self.key_points = [KeyPoint(float(x), float(y), float(size),
+				                            float(angle), float(response),
+				                            int(octave), int(class_id))
+				                   for (x, y), size, angle, response, octave, class_id
+				                   in zip(cache["points"], cache["sizes"],
+				                          cache["angles"], cache["responses"],
+				                          cache["octaves"], cache["class_ids"])]
+				self.descriptors = cache["descriptors"] \
+					if cache["descriptors"].size != 0 else None
+			return
+
+		detector.detect_and_compute(self)
+		descriptors = self.descriptors if self.descriptors is not None \
+			else np.empty((0, 0), dtype=np.uint8)
+		os.makedirs(self.CACHE_DIR, exist_ok=True)
+		np.savez_compressed(path,
+		                    points=np.array([kp.pt for kp in self.key_points],
+		                                    dtype=np.float32).reshape(-1, 2),
+		                    sizes=np.array([kp.size for kp in self.key_points]),
+		                    angles=np.array([kp.angle for kp in self.key_points]),
+		                    responses=np.array([kp.response for kp in self.key_points]),
+		                    octaves=np.array([kp.octave for kp in self.key_points]),
+		                    class_ids=np.array([kp.class_id for kp in self.key_points]),
+		                    descriptors=descriptors)
+
+	def release(self) -> None:
+		"""Drop all the cached images of the frame to free memory.
+
+		:return:
+			None
+		"""
+		self._cv2_rgb = None
+		self._cv2_depth = None
+		self._cv2_gray = None
+		self._cv2_rgb_future = None
+		self._cv2_depth_future = None
 	
 	def get_rgbd_image(self) -> o3d.geometry.RGBDImage:
 		# TODO: implement automatic way to extract rgbd from a couple of any type of images
@@ -199,8 +442,57 @@ class Frame(ProjectObject):
 		return pcd
 
 	def get_size(self):
-		with Image.open(self.color_path) as img:
-			return img.size
+		"""Gets the size of the color image of the frame.
+
+		:return:
+			The width and the height of the color image.
+		:rtype: Tuple[int, int]
+		"""
+		if self._size is None:
+			if self._cv2_rgb is None:
+				self._size = self._read_header_size(self.color_path)
+			if self._size is None:
+				# already decoded, or unknown format or header too long
+				height, width = self.rgb.shape[:2]
+				self._size = (width, height)
+		return self._size
+
+	@staticmethod
+	def _read_header_size(path: str) -> Union[Tuple[int, int], None]:
+		"""Reads the size of a JPEG or PNG image from its header only.
+
+		:param path:
+			The path of the image whose size must be read.
+
+		:return:
+			The width and the height of the image, None if they are not found
+			in the header.
+		:rtype: Tuple[int, int]
+		"""
+		with open(path, "rb") as file:
+			header = file.read(65536)
+
+		if header[:8] == b"\x89PNG\r\n\x1a\n" and len(header) >= 24:
+			return struct.unpack(">II", header[16:24])
+		elif header[:2] == b"\xff\xd8":
+			# walk through the JPEG segments until a start of frame marker
+			offset = 2
+			while offset + 9 <= len(header):
+				if header[offset] != 0xFF:
+					break
+				marker = header[offset + 1]
+				if marker == 0xFF:
+					offset += 1
+					continue
+				if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+				              0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+					height, width = struct.unpack(">HH",
+					                              header[offset + 5:offset + 9])
+					return width, height
+				length = struct.unpack(">H", header[offset + 2:offset + 4])[0]
+				offset += 2 + length
+
+		return None
 
 	def calibration_matrix(self):
 		return np.mat([[self.fx, 0, self.Cx],
@@ -208,9 +500,7 @@ class Frame(ProjectObject):
 		               [0, 0, 1]])
 
 	def get_width(self):
-		image = np.asarray(self.get_o3d_images(ret="rgb"))
-		return image.shape[1]
+		return self.get_size()[0]
 	
 	def get_height(self):
-		image = np.asarray(self.get_o3d_images(ret="rgb"))
-		return image.shape[0]
+		return self.get_size()[1]
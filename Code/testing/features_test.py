@@ -50,7 +50,9 @@ epi_image = action.show_epipolar_lines()
 inliers_image = merger.merge_inliers(action)
 
 # Show the final image
-cv2.imshow("Matches", merge_image)
+if merge_image is not None:
+    cv2.imshow("Matches", merge_image)
 cv2.imshow("EpiLines", epi_image)
-cv2.imshow("Inliers", inliers_image)
+if inliers_image is not None:
+    cv2.imshow("Inliers", inliers_image)
 cv2.waitKey()
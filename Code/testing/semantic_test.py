@@ -27,5 +27,6 @@ action.set_inliers(mask)
 
 inliers_image = merger.merge_inliers(action)
 
-cv2.imshow("Inliers", inliers_image)
+if inliers_image is not None:
+    cv2.imshow("Inliers", inliers_image)
 cv2.waitKey()
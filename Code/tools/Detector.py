@@ -9,6 +9,7 @@ Advisors : Giacomo Boracchi, Luca Magri
 University : Politecnico di Milano - A.Y. 2021/2022
 """
 import cv2
+import numpy as np
 
 from camera.Frame import Frame
 
@@ -40,6 +41,7 @@ class Detector:
         :type method: str
         """
         self.num_features = num_features
+        self.method = method
 
         # method choice
         if method == self.ORB:
@@ -58,7 +60,8 @@ class Detector:
     ):
         """
         Private static method useful to preprocess the image in grayscale
-        and in a built-in way within the class.
+        and in a built-in way within the class. The image is decoded directly
+        in grayscale instead of being converted from BGR.
 
         :param img:
             Image in RGB to be processed into grayscale.
@@ -69,7 +72,30 @@ class Detector:
         :rtype: image
         """
         # returning it back to grayscale
-        return cv2.cvtColor(img.get_cv2_images(ret="rgb"), cv2.COLOR_BGR2GRAY)
+        return img.get_gray()
+
+    @staticmethod
+    def _to_root_sift(
+        descriptors
+    ):
+        """
+        Private static method mapping SIFT descriptors to RootSIFT ones, so
+        that their euclidean distance is the Hellinger distance of the
+        original descriptors.
+
+        :param descriptors:
+            SIFT descriptors of an image.
+        :type descriptors: np.ndarray
+
+        :return:
+            RootSIFT descriptors.
+        :rtype: np.ndarray
+        """
+        descriptors = descriptors / (np.linalg.norm(descriptors, ord=1,
+                                                    axis=1, keepdims=True)
+                                     + 1e-7)
+        np.sqrt(descriptors, out=descriptors)
+        return descriptors.astype(np.float32)
 
     def detect_and_compute(
         self,
@@ -91,8 +117,12 @@ class Detector:
         :returns:
             Key-points and Descriptors
         """
+        key_points, descriptors = self.core.detectAndCompute(
+            self._preprocess(img), None)
+        if self.method == self.SIFT and descriptors is not None:
+            descriptors = self._to_root_sift(descriptors)
+
         if inplace:
-            img.key_points, img.descriptors = self.core.detectAndCompute(
-                self._preprocess(img), None)
+            img.key_points, img.descriptors = key_points, descriptors
         else:
-            return self.core.detectAndCompute(self._preprocess(img), None)
+            return key_points, descriptors
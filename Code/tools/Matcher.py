@@ -8,6 +8,9 @@ Professor : Vincenzo Caglioti
 Advisors : Giacomo Boracchi, Luca Magri
 University : Politecnico di Milano - A.Y. 2021/2022
 """
+import hashlib
+import os
+
 import cv2
 import numpy as np
 
@@ -22,14 +25,30 @@ class Matcher:
     """
     # Techniques available:
     FLANN = 'FLANN'
+    HNSW = 'HNSW'
+    HAMMING = 'HAMMING'
     DNN = 'DNN'
+    # Under this number of binary descriptors a brute-force Hamming sweep is
+    # faster than the LSH index, above it FLANN wins
+    BF_MAX_FEATURES = 4000
+    # Side of the blocks of descriptors compared at once by the NumPy Hamming,
+    # one 64-bit word at a time the 128 x 128 XOR block takes 128 KiB and the
+    # uint16 distance block 32 KiB, so they fit the L2 cache
+    HAMMING_TILE = 128
+    # Flags decoding the color images reduced by a factor while drawing
+    REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION,
+                     4: cv2.IMREAD_REDUCED_COLOR_4 | cv2.IMREAD_IGNORE_ORIENTATION,
+                     8: cv2.IMREAD_REDUCED_COLOR_8 | cv2.IMREAD_IGNORE_ORIENTATION}
 
     def __init__(
         self,
         num_features,
         method,
         search_algorithm=6,
-        filter_test=0.7
+        filter_test=0.7,
+        keep_ratio=1.0,
+        cross_check=False,
+        index_cache_dir=None
     ):
         """
         Constructor.
@@ -50,12 +69,39 @@ class Matcher:
         :param filter_test:
             Value used to filter matching features through Lowe's Test.
         :type filter_test: float
+
+        :param keep_ratio:
+            Fraction of the features, with the highest response, that are kept
+            for matching.
+        :type keep_ratio: float
+
+        :param cross_check:
+            If the matches must also be mutual nearest neighbours.
+        :type cross_check: bool
+
+        :param index_cache_dir:
+            Directory where the HNSW indices are saved and reused, if any.
+        :type index_cache_dir: str
         """
         self.num_features = num_features
         self.filter_test = filter_test
+        self.keep_ratio = keep_ratio
+        self.cross_check = cross_check
+        self.index_cache_dir = index_cache_dir
+        self.method = method
+
+        # descriptors over which the index of the core has been trained
+        self._train_descriptors = None
+        # descriptors over which the reverse HNSW graph of cross_check is built
+        self._reverse_descriptors = None
+        self._reverse_core = None
 
         # method choice
-        if method == self.FLANN:
+        if method == self.FLANN and search_algorithm == 6 and \
+                self.num_features <= self.BF_MAX_FEATURES:
+            # few binary descriptors are matched faster by XOR and popcount
+            self.core = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+        elif method == self.FLANN:
             # FLANN hyper-parameters by default
             if search_algorithm == 6:
                 index_params = dict(algorithm=search_algorithm,
@@ -68,50 +114,459 @@ class Matcher:
             search_params = dict(checks=self.num_features)
             self.core = cv2.FlannBasedMatcher(indexParams=index_params,
                                               searchParams=search_params)
+        elif method == self.HNSW:
+            # the HNSW graph is built when the training set is known
+            self.core = None
+        elif method == self.HAMMING:
+            # brute-force XOR and popcount in NumPy, there is no index
+            self.core = None
         elif method == self.DNN:
             # TODO : link and develop Matching Deep Neural Network
             print('\033[91m' + 'DNN matcher to be done yet...' + '\033[0m')
         else:
             print('\033[91m' + 'Method not found' + '\033[0m')
 
+    def add_train(
+        self,
+        frame: Frame
+    ):
+        """
+        Train the index of the matcher over the descriptors of the frame, the
+        index is kept and reused by all the following matches against the
+        same frame.
+
+        :param frame:
+            Frame whose descriptors are the training set.
+        :type frame: Frame
+        """
+        if frame.descriptors is None:
+            # nothing to train on, frames without descriptors match nothing
+            self.clear()
+            return
+        if self._train_descriptors is frame.descriptors:
+            return
+
+        if self.method == self.HAMMING:
+            self._check_binary(frame.descriptors)
+
+        self.clear()
+        if self.method == self.HNSW:
+            self.core = self._build_hnsw(frame.descriptors)
+        elif self.method != self.HAMMING:
+            self.core.add([frame.descriptors])
+            self.core.train()
+        self._train_descriptors = frame.descriptors
+
+    def clear(
+        self
+    ):
+        """
+        Drop the training set and the trained index of the matcher.
+        """
+        if self._train_descriptors is not None:
+            if self.method in (self.HNSW, self.HAMMING):
+                self.core = None
+            else:
+                self.core.clear()
+            self._train_descriptors = None
+
+    @staticmethod
+    def _hnsw_vectors(
+        descriptors
+    ):
+        """
+        Private static method converting the descriptors into the vectors
+        indexed by HNSW. Binary descriptors are unpacked into bits so that the
+        squared euclidean distance between them is their Hamming distance.
+
+        :param descriptors:
+            Descriptors of a frame.
+        :type descriptors: np.ndarray
+
+        :return:
+            The float vectors to be indexed or queried.
+        :rtype: np.ndarray
+        """
+        if descriptors.dtype == np.uint8:
+            return np.unpackbits(descriptors, axis=1).astype(np.float32)
+        return np.asarray(descriptors, dtype=np.float32)
+
+    def _build_hnsw(
+        self,
+        descriptors
+    ):
+        """
+        Private method building the HNSW graph over the descriptors.
+
+        :param descriptors:
+            Descriptors of the training frame.
+        :type descriptors: np.ndarray
+
+        :return:
+            The HNSW index of the descriptors.
+        :rtype: hnswlib.Index
+        """
+        import hnswlib
+
+        vectors = self._hnsw_vectors(descriptors)
+        index = hnswlib.Index(space='l2', dim=vectors.shape[1])
+
+        # indices are cached by the content of the descriptors
+        path = None
+        if self.index_cache_dir is not None:
+            name = hashlib.md5(descriptors.tobytes()).hexdigest() + '.bin'
+            path = os.path.join(self.index_cache_dir, name)
+
+        if path is not None and os.path.exists(path):
+            index.load_index(path, max_elements=vectors.shape[0])
+        else:
+            index.init_index(max_elements=vectors.shape[0],
+                             ef_construction=200,
+                             M=16)
+            index.add_items(vectors)
+            if path is not None:
+                os.makedirs(self.index_cache_dir, exist_ok=True)
+                index.save_index(path)
+        index.set_ef(50)
+        return index
+
+    def _hnsw_knn_match(
+        self,
+        descriptors
+    ):
+        """
+        Private method querying the HNSW graph and returning the neighbours
+        shaped as the ones of the OpenCV matchers.
+
+        :param descriptors:
+            Descriptors of the query frame.
+        :type descriptors: np.ndarray
+
+        :return:
+            The two nearest neighbours of each query descriptor.
+        :rtype: list
+        """
+        k = min(2, self.core.get_current_count())
+        labels, distances = self.core.knn_query(self._hnsw_vectors(descriptors),
+                                                k=k)
+
+        # hnswlib returns squared distances, Hamming ones for binary vectors
+        if descriptors.dtype != np.uint8:
+            distances = np.sqrt(distances)
+
+        return self._to_dmatches(labels, distances)
+
+    @staticmethod
+    def _to_dmatches(
+        labels,
+        distances
+    ):
+        """
+        Private static method shaping the neighbours found as the ones of the
+        OpenCV matchers.
+
+        :param labels:
+            Train indices of the neighbours of each query descriptor.
+        :type labels: np.ndarray
+
+        :param distances:
+            Distances of the neighbours of each query descriptor.
+        :type distances: np.ndarray
+
+        :return:
+            The nearest neighbours of each query descriptor.
+        :rtype: list
+        """
+        return [[cv2.DMatch(i, int(label), 0, float(distance))
+                 for label, distance in zip(labels[i], distances[i])]
+                for i in range(labels.shape[0])]
+
+    @staticmethod
+    def _check_binary(
+        descriptors
+    ):
+        """
+        Private static method checking that the descriptors are binary, as
+        required by the Hamming backend.
+
+        :param descriptors:
+            Descriptors of a frame.
+        :type descriptors: np.ndarray
+        """
+        if descriptors.dtype != np.uint8:
+            raise ValueError("The HAMMING matcher requires binary uint8 "
+                             "descriptors, got %s ones" % descriptors.dtype)
+
+    @staticmethod
+    def _popcount64(
+        x
+    ):
+        """
+        Private static method counting the set bits of each 64-bit word.
+
+        :param x:
+            Array of 64-bit words.
+        :type x: np.ndarray
+
+        :return:
+            The number of set bits of each word.
+        :rtype: np.ndarray
+        """
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(x)
+
+        # SWAR popcount for NumPy older than 2.0
+        x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        x = (x & np.uint64(0x3333333333333333)) + \
+            ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+    @staticmethod
+    def _bf_hamming_np(
+        descriptors_1,
+        descriptors_2,
+        k=2
+    ):
+        """
+        Private static method finding by brute-force the nearest neighbours
+        in Hamming distance of binary descriptors.
+
+        :param descriptors_1:
+            Binary descriptors queried.
+        :type descriptors_1: np.ndarray
+
+        :param descriptors_2:
+            Binary descriptors searched.
+        :type descriptors_2: np.ndarray
+
+        :param k:
+            Maximum number of neighbours of each query descriptor.
+        :type k: int
+
+        :return:
+            The indices and the distances of the neighbours sorted by
+            distance.
+        :rtype: tuple
+        """
+        # pad the descriptors to be seen as 64-bit words
+        padding = -descriptors_1.shape[1] % 8
+        if padding != 0:
+            descriptors_1 = np.pad(descriptors_1, ((0, 0), (0, padding)))
+            descriptors_2 = np.pad(descriptors_2, ((0, 0), (0, padding)))
+        words_1 = np.ascontiguousarray(descriptors_1).view(np.uint64)
+        words_2 = np.ascontiguousarray(descriptors_2).view(np.uint64)
+
+        k = min(k, words_2.shape[0])
+        tile = Matcher.HAMMING_TILE
+        labels = np.full((words_1.shape[0], k), -1, dtype=np.int64)
+        distances = np.full((words_1.shape[0], k), np.iinfo(np.int64).max,
+                            dtype=np.int64)
+        if k == 0:
+            return labels, distances
+
+        xor = np.empty((tile, tile), dtype=np.uint64)
+        for i in range(0, words_1.shape[0], tile):
+            block_1 = words_1[i:i + tile]
+            best_labels = labels[i:i + tile]
+            best_dist = distances[i:i + tile]
+
+            for j in range(0, words_2.shape[0], tile):
+                block_2 = words_2[j:j + tile]
+                block_xor = xor[:block_1.shape[0], :block_2.shape[0]]
+
+                # accumulate the distances one 64-bit word at a time
+                dist = np.zeros(block_xor.shape, dtype=np.uint16)
+                for w in range(words_1.shape[1]):
+                    np.bitwise_xor(block_1[:, w, None], block_2[None, :, w],
+                                   out=block_xor)
+                    dist += Matcher._popcount64(block_xor).astype(np.uint16)
+
+                # merge the k nearest of the block with the current ones
+                block_k = min(k, block_2.shape[0])
+                nearest = np.argpartition(dist, block_k - 1, axis=1)[:, :block_k]
+                candidates = np.concatenate((best_labels, nearest + j), axis=1)
+                candidates_dist = np.concatenate(
+                    (best_dist, np.take_along_axis(dist, nearest, axis=1)),
+                    axis=1)
+                order = np.argsort(candidates_dist, axis=1, kind="stable")[:, :k]
+                best_labels[:] = np.take_along_axis(candidates, order, axis=1)
+                best_dist[:] = np.take_along_axis(candidates_dist, order, axis=1)
+
+        return labels, distances
+
+    def _prune(
+        self,
+        frame: Frame
+    ):
+        """
+        Private method keeping only the features of the frame having the
+        highest response, the pruned features are saved back on the frame.
+
+        :param frame:
+            Frame whose features are pruned.
+        :type frame: Frame
+        """
+        keep = int(self.keep_ratio * self.num_features)
+        if len(frame.key_points) <= keep:
+            return
+
+        responses = np.fromiter((kp.response for kp in frame.key_points),
+                                dtype=np.float32,
+                                count=len(frame.key_points))
+        best = np.sort(np.argsort(-responses)[:keep])
+        frame.key_points = [frame.key_points[i] for i in best]
+        frame.descriptors = frame.descriptors[best]
+
+    @staticmethod
+    def _has_descriptors(
+        frame: Frame
+    ):
+        """
+        Private static method checking if the frame has any descriptor.
+
+        :param frame:
+            Frame to be checked.
+        :type frame: Frame
+
+        :return:
+            True if the frame has at least one descriptor.
+        :rtype: bool
+        """
+        return frame.descriptors is not None and frame.descriptors.shape[0] != 0
+
+    def _knn_match(
+        self,
+        query: Frame,
+        train: Frame
+    ):
+        """
+        Private method matching the query frame against the train frame by
+        reusing the trained index whenever the train frame does not change.
+
+        :param query:
+            Frame whose descriptors are queried.
+        :type query: Frame
+
+        :param train:
+            Frame whose descriptors are the training set.
+        :type train: Frame
+
+        :return:
+            The two nearest neighbours of each query descriptor.
+        :rtype: list
+        """
+        if not self._has_descriptors(query) or not self._has_descriptors(train):
+            return []
+
+        if self.keep_ratio < 1.0:
+            self._prune(query)
+            self._prune(train)
+
+        self.add_train(train)
+        if self.method == self.HNSW:
+            return self._hnsw_knn_match(query.descriptors)
+        elif self.method == self.HAMMING:
+            self._check_binary(query.descriptors)
+            return self._to_dmatches(*self._bf_hamming_np(query.descriptors,
+                                                          train.descriptors))
+        return self.core.knnMatch(query.descriptors, k=2)
+
+    def _reverse_nearest(
+        self,
+        query: Frame,
+        train: Frame
+    ):
+        """
+        Private method finding the nearest neighbour among the query
+        descriptors of each train descriptor.
+
+        :param query:
+            Frame whose descriptors are queried.
+        :type query: Frame
+
+        :param train:
+            Frame whose descriptors are the training set.
+        :type train: Frame
+
+        :return:
+            The index of the nearest query descriptor of each train
+            descriptor, -1 if it has none.
+        :rtype: np.ndarray
+        """
+        if train.descriptors is None:
+            return np.full(0, -1, dtype=np.int64)
+        nearest = np.full(train.descriptors.shape[0], -1, dtype=np.int64)
+        if query.descriptors is None:
+            return nearest
+
+        if self.method == self.HNSW:
+            # an empty graph cannot be built nor queried, the graph over the
+            # query frame is kept as the one over the train frame
+            if query.descriptors.shape[0] == 0 or nearest.shape[0] == 0:
+                return nearest
+            if self._reverse_descriptors is not query.descriptors:
+                self._reverse_core = self._build_hnsw(query.descriptors)
+                self._reverse_descriptors = query.descriptors
+            labels, _ = self._reverse_core.knn_query(
+                self._hnsw_vectors(train.descriptors), k=1)
+            return labels[:, 0].astype(np.int64)
+        elif self.method == self.HAMMING:
+            labels, _ = self._bf_hamming_np(train.descriptors,
+                                            query.descriptors,
+                                            k=1)
+            return labels[:, 0] if labels.shape[1] != 0 else nearest
+
+        for pair in self.core.knnMatch(train.descriptors, query.descriptors,
+                                       k=1):
+            if len(pair) != 0:
+                nearest[pair[0].queryIdx] = pair[0].trainIdx
+        return nearest
+
     @staticmethod
     def _filter(
         img_1: Frame,
         img_2: Frame,
         matches,
-        filter_test
+        filter_test,
+        nearest=None
     ):
         """
         Private static method useful to filter the images matching in a
         built-in way within the class.
 
         :param matches:
-            Matched features.
+            Matched features, pairs with less than two neighbours are dropped.
         :type matches: list
 
         :param filter_test:
             Value used to filter matching features through Lowe's Test.
         :type: int
 
+        :param nearest:
+            Nearest first image descriptor of each second image descriptor,
+            if given only mutual nearest neighbours are kept.
+        :type nearest: np.ndarray
+
         :return:
             Good matches which passed the Lowe's test.
         :rtype: list
         """
-        # empty list which will be enriched of inliers
-        good = []
-        try:
-            for m, n in matches:
-                # Lowe's test
-                if m.distance < filter_test * n.distance:
-                    img_1.points.append(img_1.key_points[m.queryIdx].pt)
-                    img_2.points.append(img_2.key_points[m.trainIdx].pt)
-                    good.append(m)
-            img_1.points = np.int32(img_1.points)
-            img_2.points = np.int32(img_2.points)
-            return good
-        except ValueError:
-            print('\033[91m' + 'Filter matching error' + '\033[0m')
-            pass
+        # Lowe's test, and mutual nearest neighbours test, in a single pass
+        if nearest is None:
+            good = [pair[0] for pair in matches
+                    if len(pair) == 2 and
+                    pair[0].distance < filter_test * pair[1].distance]
+        else:
+            nearest = nearest.tolist()
+            good = [pair[0] for pair in matches
+                    if len(pair) == 2 and
+                    pair[0].distance < filter_test * pair[1].distance and
+                    nearest[pair[0].trainIdx] == pair[0].queryIdx]
+
+        img_1.points = np.int32([img_1.key_points[m.queryIdx].pt for m in good])
+        img_2.points = np.int32([img_2.key_points[m.trainIdx].pt for m in good])
+        return good
 
     def match_frames(
         self,
@@ -134,9 +589,10 @@ class Matcher:
             Good matches which passed the Lowe's test.
         :rtype: list
         """
-        matches = self.core.knnMatch(img_1.descriptors, img_2.descriptors, k=2)
-        matches = [x for x in matches if len(x) == 2]
-        return self._filter(img_1, img_2, matches, self.filter_test)
+        matches = self._knn_match(img_1, img_2)
+        nearest = self._reverse_nearest(img_1, img_2) if self.cross_check \
+            else None
+        return self._filter(img_1, img_2, matches, self.filter_test, nearest)
 
     def match_action(
         self,
@@ -154,19 +610,91 @@ class Matcher:
             Good matches which passed the Lowe's test.
         :rtype: list
         """
-        action.matches = self.core.knnMatch(action.first.descriptors,
-                                            action.second.descriptors,
-                                            k=2)
-        action.links = [x for x in action.matches if len(x) == 2]
+        action.matches = self._knn_match(action.first, action.second)
+        nearest = self._reverse_nearest(action.first, action.second) \
+            if self.cross_check else None
         action.links = self._filter(action.first, action.second,
-                                    action.links, self.filter_test)
+                                    action.matches, self.filter_test, nearest)
+
+    @staticmethod
+    def _draw_matches(
+        img_1: Frame,
+        img_2: Frame,
+        matches,
+        downscale=1,
+        target_size=None
+    ):
+        """
+        Private static method drawing the matches between two frames.
+
+        :param img_1:
+            First image.
+        :type img_1: Frame
+
+        :param img_2:
+            Second image.
+        :type img_2: Frame
+
+        :param matches:
+            Matched features to be drawn.
+        :type matches: list
+
+        :param downscale:
+            Factor among 1, 2, 4 and 8 by which the images are reduced while
+            being decoded.
+        :type downscale: int
+
+        :param target_size:
+            Width and height to which the final image is resized, if any.
+        :type target_size: tuple
+
+        :return:
+            The two images merged into one image with matching links drawn.
+        :rtype: cv2.Image
+        """
+        # hyper-parameters before drawing
+        draw_params = dict(matchColor=-1,  # draw matches in green color
+                           singlePointColor=None,
+                           matchesMask=None,  # draw only inliers
+                           flags=2)
+
+        images, key_points = [], []
+        for frame in (img_1, img_2):
+            if downscale == 1:
+                images.append(frame.rgb)
+                key_points.append(frame.key_points)
+            else:
+                images.append(frame.get_cv2_images(
+                    ret="rgb", flags=Matcher.REDUCED_FLAGS[downscale]))
+                key_points.append([cv2.KeyPoint(kp.pt[0] / downscale,
+                                                kp.pt[1] / downscale,
+                                                kp.size / downscale,
+                                                kp.angle,
+                                                kp.response,
+                                                kp.octave,
+                                                kp.class_id)
+                                   for kp in frame.key_points])
+
+        # proper drawing method
+        final_img = cv2.drawMatches(images[0],
+                                    key_points[0],
+                                    images[1],
+                                    key_points[1],
+                                    matches,
+                                    None, **draw_params)
+
+        if target_size is not None:
+            final_img = cv2.resize(final_img, target_size)
+        return final_img
 
     @staticmethod
     def draw_frames_matches(
         img_1: Frame,
         img_2: Frame,
         matches,
-        limit=-1
+        limit=-1,
+        downscale=1,
+        target_size=None
     ):
         """
         Private static method to be used to draw the final result of the
@@ -188,36 +716,39 @@ class Matcher:
             Integer number which limits how many matching links to be drawn.
         :type limit: int
 
+        :param downscale:
+            Factor among 1, 2, 4 and 8 by which the images are reduced while
+            being decoded.
+        :type downscale: int
+
+        :param target_size:
+            Width and height to which the final image is resized, if any.
+        :type target_size: tuple
+
         :return:
-            The two images merged into one image with matching links drawn.
+            The two images merged into one image with matching links drawn, or
+            None if there is nothing to draw.
         :rtype: cv2.Image
         """
+        # nothing to draw, avoid decoding the images at all
+        if limit == 0 or len(matches) == 0:
+            return None
+
         # pre-conditions
         assert img_1.get_size() == img_2.get_size(), "Images do not have the" \
                                                      " same size!"
 
-        # hyper-parameters before drawing
-        draw_params = dict(matchColor=-1,  # draw matches in green color
-                           singlePointColor=None,
-                           matchesMask=None,  # draw only inliers
-                           flags=2)
-
-        # proper drawing method
-        final_img = cv2.drawMatches(img_1.get_cv2_images(ret="rgb"),
-                                    img_1.key_points,
-                                    img_2.get_cv2_images(ret="rgb"),
-                                    img_2.key_points,
-                                    matches[:limit],
-                                    None, **draw_params)
-
-        width, height = img_1.get_size()
-        return cv2.resize(final_img, (width * 2, height))
+        return Matcher._draw_matches(img_1, img_2, matches[:limit],
+                                     downscale=downscale,
+                                     target_size=target_size)
 
     @staticmethod
     def draw_action_matches(
         action: Action,
         limit=-1,
-        inliers=False
+        inliers=False,
+        downscale=1,
+        target_size=None
     ):
         """
         Private static method to be used to draw the final result of the
@@ -235,35 +766,37 @@ class Matcher:
             Choose if to draw matches just for the previously computed inliers.
         :rtype inliers: bool
 
+        :param downscale:
+            Factor among 1, 2, 4 and 8 by which the images are reduced while
+            being decoded.
+        :type downscale: int
+
+        :param target_size:
+            Width and height to which the final image is resized, if any.
+        :type target_size: tuple
+
         :return:
-            The two images merged into one image with matching links drawn.
+            The two images merged into one image with matching links drawn, or
+            None if there is nothing to draw.
         :rtype: cv2.Image
         """
         # pre-conditions
-        assert action.first.get_size() == action.second.get_size(), \
-            "Frames size mismatch!"
         if inliers:
             assert action.links_inliers is not None, \
                 "Compute the inliers before!"
 
-        # hyper-parameters before drawing
-        draw_params = dict(matchColor=-1,  # draw matches in green color
-                           singlePointColor=None,
-                           matchesMask=None,  # draw only inliers
-                           flags=2)
-
         # select the proper matching
         matches = action.links_inliers[:limit] if inliers \
             else action.links[:limit]
 
-        # proper drawing method
-        final_img = cv2.drawMatches(action.first.get_cv2_images(ret="rgb"),
-                                    action.first.key_points,
-                                    action.second.get_cv2_images(ret="rgb"),
-                                    action.second.key_points,
-                                    matches,
-                                    None, **draw_params)
+        # nothing to draw, avoid decoding the images at all
+        if limit == 0 or len(matches) == 0:
+            return None
+
+        assert action.first.get_size() == action.second.get_size(), \
+            "Frames size mismatch!"
 
         # returning the finale image collage with the drawn matches
-        width, height = action.first.get_size()
-        return cv2.resize(final_img, (width * 2, height))
+        return Matcher._draw_matches(action.first, action.second, matches,
+                                     downscale=downscale,
+                                     target_size=target_size)
@@ -25,7 +25,8 @@ class Merger:
 		self,
 		num_features=50,
 		detector_method="ORB",
-		matcher_method="FLANN"
+		matcher_method="FLANN",
+		cache_descriptors=False
 	):
 		"""
 		Constructor.
@@ -41,9 +42,14 @@ class Merger:
 		:param matcher_method:
 			The string name of the chosen matching-method.
 		:type matcher_method: str
+
+		:param cache_descriptors:
+			If key points and descriptors must be cached on disk and reused.
+		:type cache_descriptors: bool
 		"""
 		# Detector initialization
 		self.detector = Detector(num_features, detector_method)
+		self.cache_descriptors = cache_descriptors
 
 		# the algorithm changes based on the technique adopted
 		algorithm = 0 if detector_method == "SIFT" else 6
@@ -54,6 +60,23 @@ class Merger:
 		                       search_algorithm=algorithm,
 		                       filter_test=0.7)
 
+	def _detect(
+		self,
+		img: Frame
+	):
+		"""
+		Detect the features of the image and compute their descriptors, or
+		load them from the disk cache if enabled.
+
+		:param img:
+			Image to be feature-detected.
+		:type img: Frame
+		"""
+		if self.cache_descriptors:
+			img.load_or_compute_descriptors(self.detector)
+		else:
+			self.detector.detect_and_compute(img)
+
 	def merge_frames(
 		self,
 		img_1: Frame,
@@ -76,12 +99,13 @@ class Merger:
 		:type limit: int
 
 		:return:
-			The two images merged into one image with matching links drawn.
+			The two images merged into one image with matching links drawn, or
+			None if there is nothing to draw.
 		:rtype: image
 		"""
 		# detect features
-		self.detector.detect_and_compute(img_1)
-		self.detector.detect_and_compute(img_2)
+		self._detect(img_1)
+		self._detect(img_2)
 
 		# match the frames and return the final result
 		matches = self.matcher.match_frames(img_1, img_2)
@@ -111,13 +135,14 @@ class Merger:
 		:type return_draw: bool
 
 		:return:
-			The two images merged into one image with matching links drawn.
+			The two images merged into one image with matching links drawn, or
+			None if there is nothing to draw.
 		:rtype: image
 		"""
 		if action.first.key_points is None or action.first.descriptors is None:
-			self.detector.detect_and_compute(action.first)
+			self._detect(action.first)
 		if action.second.key_points is None or action.second.descriptors is None:
-			self.detector.detect_and_compute(action.second)
+			self._detect(action.second)
 
 		self.matcher.match_action(action)
 		
@@ -143,7 +168,8 @@ class Merger:
 		:type limit: int
 
 		:return:
-			The two images merged into one image with matching links drawn.
+			The two images merged into one image with matching links drawn, or
+			None if there is nothing to draw.
 		:rtype: image
 		"""
 		# pre-conditions